@@ -0,0 +1,24 @@
+# scripts/convert_to_parquet.py
+#
+# One-off conversion of the match CSV to Parquet for the dashboard.
+# Re-run whenever data/football_matches_2024_2025.csv is updated:
+#     python scripts/convert_to_parquet.py
+
+import os
+
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "..", "data")
+CSV_PATH = os.path.join(DATA_DIR, "football_matches_2024_2025.csv")
+PARQUET_PATH = os.path.join(DATA_DIR, "football_matches_2024_2025.parquet")
+
+
+def main():
+    df = pd.read_csv(CSV_PATH, parse_dates=["date_utc"])
+    df.to_parquet(PARQUET_PATH, engine="pyarrow", compression="zstd", index=False)
+    print(f"Wrote {len(df)} rows to {os.path.normpath(PARQUET_PATH)}")
+
+
+if __name__ == "__main__":
+    main()
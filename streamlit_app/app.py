@@ -2,7 +2,9 @@
 
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.express as px
+import plotly.graph_objects as go
 import os
 
 # ============================
@@ -15,139 +17,396 @@ st.title("⚽ Football Match Analysis Dashboard (2024–25)")
 # LOAD DATA
 # ============================
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DATA_PATH = os.path.join(BASE_DIR, "..", "data", "football_matches_2024_2025.csv")
+# Generated from the CSV by scripts/convert_to_parquet.py
+DATA_PATH = os.path.join(BASE_DIR, "..", "data", "football_matches_2024_2025.parquet")
+
+# Only these columns are decoded from the Parquet file
+REQUIRED_COLUMNS = [
+    "competition_name", "stage", "date_utc", "matchday", "referee",
+    "home_team", "away_team", "fulltime_home", "fulltime_away",
+    "goal_difference", "total_goals", "match_outcome",
+]
+
+# Columns read by the KPIs and charts once a competition is picked
+USED_COLS = [
+    "stage", "date_utc", "matchday", "referee", "home_team", "away_team",
+    "fulltime_home", "fulltime_away", "goal_difference", "total_goals", "match_outcome",
+]
+
+# Columns the aggregations read as numpy arrays (date_utc is only shown in the
+# top-10 table, and converting it would build an object array of Timestamps)
+ARRAY_COLS = [col for col in USED_COLS if col != "date_utc"]
+
+# Small integer counts (goals, goal difference, matchday), stored as int8 instead of int64
+INT8_COLUMNS = [
+    "fulltime_home", "fulltime_away", "total_goals", "goal_difference", "matchday",
+]
+
+# Low-cardinality string columns, stored as category codes
+CATEGORY_COLUMNS = [
+    "competition_name", "stage", "home_team", "away_team", "match_outcome", "referee",
+]
+
+
+@st.cache_data(show_spinner=False)
+def load_matches(path: str) -> tuple[pd.DataFrame, dict, list, list]:
+    # Parsed once per path; reruns (every filter change) reuse the cached frame.
+    # Downstream code must treat the result as read-only.
+    df = pd.read_parquet(path, columns=REQUIRED_COLUMNS, engine="pyarrow")
+    for col in CATEGORY_COLUMNS:
+        df[col] = df[col].astype("category")
+    int8 = np.iinfo(np.int8)
+    for col in INT8_COLUMNS:
+        # astype would wrap silently on overflow, so check the range first
+        if df[col].min() < int8.min or df[col].max() > int8.max:
+            raise ValueError(f"Column {col!r} has values outside the int8 range")
+        df[col] = df[col].astype("int8")
+    # Home and away share one team index so their codes can be pooled
+    teams = pd.api.types.union_categoricals(
+        [df["home_team"], df["away_team"]], sort_categories=True
+    ).categories
+    df["home_team"] = df["home_team"].cat.set_categories(teams)
+    df["away_team"] = df["away_team"].cat.set_categories(teams)
+
+    # Sort so every (competition, stage) group - and every competition - is a
+    # contiguous block of rows, then record each block as a (start, end) range.
+    # "All" is indexed per competition so matches with a missing stage stay in it.
+    # The original row ids are kept as the index; the ranges are positional.
+    df = df.sort_values(["competition_name", "stage", "date_utc"], kind="stable")
+    slices = {}
+    for league, idx in df.groupby("competition_name", sort=False, observed=True).indices.items():
+        slices[(league, "All")] = (idx[0], idx[-1] + 1)
+    for (league, stage), idx in df.groupby(["competition_name", "stage"], sort=False, observed=True).indices.items():
+        slices[(league, stage)] = (idx[0], idx[-1] + 1)
+
+    # Sidebar options, built once from the category lists rather than on every rerun
+    leagues = sorted(df["competition_name"].cat.categories.tolist())
+    stages = ["All"] + sorted(df["stage"].cat.categories.tolist())
+    return df, slices, leagues, stages
+
 
 try:
-    df = pd.read_csv(DATA_PATH)
+    df, slices, leagues, stages = load_matches(DATA_PATH)
 except FileNotFoundError:
     st.error("Dataset not found. Please check file path.")
     st.stop()
+except ValueError as e:
+    st.error(f"Dataset could not be loaded: {e}")
+    st.stop()
 
 # ============================
 # SIDEBAR FILTERS
 # ============================
 st.sidebar.header("Filters")
-league = st.sidebar.selectbox("Select Competition", sorted(df["competition_name"].unique()))
-stages = ["All"] + sorted(df["stage"].dropna().unique())
+league = st.sidebar.selectbox("Select Competition", leagues)
 stage = st.sidebar.selectbox("Select Stage", stages)
 
-filtered = df[df["competition_name"] == league]
-if stage != "All":
-    filtered = filtered[filtered["stage"] == stage]
+start, end = slices.get((league, stage), (0, 0))
+filtered = df.iloc[start:end][USED_COLS]
 
 if filtered.empty:
     st.warning("No matches found for selected filters.")
     st.stop()
 
 # ============================
-# KPIs (UPDATED)
+# AGGREGATES
 # ============================
-total_matches = len(filtered)
-avg_goals = filtered["total_goals"].mean()
+def column_arrays(filtered: pd.DataFrame) -> dict:
+    # Struct-of-arrays copy of the slice: one numpy array per aggregated column, with
+    # categorical columns stored as their integer codes under "<name>_codes"
+    cols = {}
+    for name in ARRAY_COLS:
+        column = filtered[name]
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            cols[f"{name}_codes"] = column.cat.codes.to_numpy()
+        else:
+            cols[name] = column.to_numpy()
+    return cols
+
+
+def code_counts(codes: np.ndarray, n: int, weights: np.ndarray | None = None) -> np.ndarray:
+    # bincount over category codes, skipping missing values (code -1)
+    present = codes >= 0
+    return np.bincount(codes[present], weights=None if weights is None else weights[present], minlength=n)
+
+
+# Independent reductions over the filtered slice, one per chart. Each is a
+# microsecond-scale numpy pass on a few hundred rows, so they run serially:
+# a thread pool costs more to start than this work takes.
+def team_aggregates(cols: dict, teams: pd.Index) -> dict:
+    # Goals per team: one bincount over the pooled home/away team codes
+    team_codes = np.concatenate([cols["home_team_codes"], cols["away_team_codes"]])
+    goals = np.concatenate([cols["fulltime_home"], cols["fulltime_away"]])
+    team_totals = code_counts(team_codes, len(teams), weights=goals)
+    # Only teams that actually played in this slice
+    played = np.flatnonzero(code_counts(team_codes, len(teams)))
+    played_totals = team_totals[played]
+    # Highest totals first, ties by team name (the shared categories are sorted).
+    # At most a few dozen teams play in a slice, so one full sort is cheap.
+    top5 = played[np.lexsort((played, -played_totals))[:5]]
+    return {
+        "top_team": teams[top5[0]],
+        "top5_teams": pd.DataFrame({
+            "team": teams[top5],
+            "goals": team_totals[top5].astype(int),
+        }),
+    }
+
+
+def stage_aggregates(cols: dict, stages: pd.Index, stage: str, avg_goals: float) -> pd.DataFrame:
+    # A single selected stage is one group: its average is the overall average
+    if stage != "All":
+        return pd.DataFrame({"stage": [stage], "total_goals": [avg_goals]})
+    matches = code_counts(cols["stage_codes"], len(stages))
+    goals = code_counts(cols["stage_codes"], len(stages), weights=cols["total_goals"])
+    present = np.flatnonzero(matches)
+    return pd.DataFrame({"stage": stages[present].to_numpy(), "total_goals": goals[present] / matches[present]})
+
+
+def referee_aggregates(cols: dict, referees: pd.Index) -> pd.DataFrame:
+    matches = code_counts(cols["referee_codes"], len(referees))
+    present = np.flatnonzero(matches)
+    top10 = present[np.argsort(-matches[present], kind="stable")][:10]
+    return pd.DataFrame({"Referee": referees[top10].to_numpy(), "Matches": matches[top10]})
+
+
+def outcome_aggregates(cols: dict, outcomes: pd.Index) -> pd.DataFrame:
+    counts = code_counts(cols["match_outcome_codes"], len(outcomes))
+    present = np.flatnonzero(counts)
+    order = present[np.argsort(-counts[present], kind="stable")]
+    return pd.DataFrame({"Outcome": outcomes[order].to_numpy(), "Count": counts[order]})
+
+
+def heatmap_aggregates(cols: dict) -> np.ndarray:
+    # Scorelines are small non-negative ints: count them straight into a 2D grid
+    # (rows = away goals, columns = home goals)
+    home_goals = cols["fulltime_home"]
+    away_goals = cols["fulltime_away"]
+    heatmap_grid = np.zeros((int(away_goals.max()) + 1, int(home_goals.max()) + 1), dtype=np.int32)
+    np.add.at(heatmap_grid, (away_goals, home_goals), 1)
+    return heatmap_grid
+
+
+def histogram_aggregates(cols: dict) -> dict:
+    # Histograms are binned here so only one bar per value is sent to the browser
+    goal_diff = cols["goal_difference"]
+    goal_diff_min = int(goal_diff.min())
+    goals_hist = np.bincount(cols["total_goals"])
+    goal_diff_hist = np.bincount(goal_diff - goal_diff_min)
+    return {
+        "goals_hist": {"total_goals": np.arange(len(goals_hist)), "count": goals_hist},
+        "goal_diff_hist": {
+            "goal_difference": np.arange(goal_diff_min, goal_diff_min + len(goal_diff_hist)),
+            "count": goal_diff_hist,
+        },
+    }
+
+
+def trend_aggregates(cols: dict) -> dict:
+    matches = np.bincount(cols["matchday"])
+    goals = np.bincount(cols["matchday"], weights=cols["total_goals"])
+    present = np.flatnonzero(matches)
+    return {"matchday": present.tolist(), "total_goals": goals[present].astype(int).tolist()}
 
-team_goals = pd.concat([
-    filtered[["home_team", "fulltime_home"]].rename(columns={"home_team": "team", "fulltime_home": "goals"}),
-    filtered[["away_team", "fulltime_away"]].rename(columns={"away_team": "team", "fulltime_away": "goals"})
-])
 
-top_team = (
-    team_goals.groupby("team")["goals"]
-    .sum()
-    .sort_values(ascending=False)
-    .index[0]
-)
+@st.cache_data(show_spinner=False)
+def compute_aggregates(league: str, stage: str, _filtered: pd.DataFrame) -> dict:
+    # Cached on (league, stage) only; _filtered is the matching slice and is not hashed.
+    filtered = _filtered
+    cols = column_arrays(filtered)
+    avg_goals = cols["total_goals"].mean()
+
+    teams = team_aggregates(cols, filtered["home_team"].cat.categories)
+
+    return {
+        "kpis": {
+            "total_matches": len(filtered),
+            "avg_goals": avg_goals,
+            "top_team": teams["top_team"],
+        },
+        **histogram_aggregates(cols),
+        "outcomes": outcome_aggregates(cols, filtered["match_outcome"].cat.categories),
+        # Rows are grouped by stage, so order tied matches by date explicitly
+        "top_matches": (
+            filtered.nlargest(10, "total_goals", keep="all")
+            .sort_values(["total_goals", "date_utc"], ascending=[False, True], kind="stable")
+            .head(10)
+        ),
+        "avg_goals_stage": stage_aggregates(cols, filtered["stage"].cat.categories, stage, avg_goals),
+        "top5_teams": teams["top5_teams"],
+        "trend": trend_aggregates(cols),
+        "heatmap_grid": heatmap_aggregates(cols),
+        "ref_df": referee_aggregates(cols, filtered["referee"].cat.categories),
+    }
+
+
+agg = compute_aggregates(league, stage, filtered)
+
+# ============================
+# KPIs (UPDATED)
+# ============================
+kpis = agg["kpis"]
 
 k1, k2, k3 = st.columns(3)
-k1.metric("Total Matches", total_matches)
-k2.metric("Avg Goals / Match", f"{avg_goals:.2f}")
-k3.metric("Top Scoring Team", top_team)
+k1.metric("Total Matches", kpis["total_matches"])
+k2.metric("Avg Goals / Match", f"{kpis['avg_goals']:.2f}")
+k3.metric("Top Scoring Team", kpis["top_team"])
 
 st.markdown("---")
 
+# Each chart below is built by a cached build_figN keyed on (league, stage) and returns
+# the serialized figure; _agg/_filtered are derived from the same key and are not hashed.
+# Charts 1-3 render eagerly; charts 5+ sit in collapsed expanders and are only
+# built while their expander is open.
+
 # ============================
 # 1. Goals per Match
 # ============================
-fig1 = px.histogram(filtered, x="total_goals", nbins=12, title="Goals per Match")
-st.plotly_chart(fig1, use_container_width=True)
+@st.cache_data(show_spinner=False)
+def build_fig1(league: str, stage: str, _agg: dict) -> dict:
+    goals_hist = _agg["goals_hist"]
+    fig = go.Figure(go.Bar(x=goals_hist["total_goals"], y=goals_hist["count"]))
+    fig.update_layout(title="Goals per Match", xaxis_title="total_goals", yaxis_title="count", bargap=0)
+    return fig.to_dict()
+
+
+st.plotly_chart(build_fig1(league, stage, agg), width="stretch")
 
 # ============================
 # 2. Home vs Away Goals
 # ============================
-fig2 = px.box(
-    filtered,
-    y=["fulltime_home", "fulltime_away"],
-    labels={"value": "Goals", "variable": "Type"},
-    title="Home vs Away Goals Distribution"
-)
-st.plotly_chart(fig2, use_container_width=True)
+@st.cache_data(show_spinner=False)
+def build_fig2(league: str, stage: str, _filtered: pd.DataFrame) -> dict:
+    fig = go.Figure([
+        go.Box(y=_filtered["fulltime_home"].to_numpy(), name="fulltime_home"),
+        go.Box(y=_filtered["fulltime_away"].to_numpy(), name="fulltime_away"),
+    ])
+    fig.update_layout(
+        title="Home vs Away Goals Distribution",
+        xaxis_title="Type",
+        yaxis_title="Goals",
+        showlegend=False
+    )
+    return fig.to_dict()
+
+
+st.plotly_chart(build_fig2(league, stage, filtered), width="stretch")
 
 # ============================
 # 3. Match Outcome Distribution
 # ============================
-outcomes = filtered["match_outcome"].value_counts().reset_index()
-outcomes.columns = ["Outcome", "Count"]
-fig3 = px.pie(outcomes, names="Outcome", values="Count", title="Match Outcome Distribution")
-st.plotly_chart(fig3, use_container_width=True)
+@st.cache_data(show_spinner=False)
+def build_fig3(league: str, stage: str, _agg: dict) -> dict:
+    outcomes = _agg["outcomes"]
+    fig = go.Figure(go.Pie(labels=outcomes["Outcome"].to_numpy(), values=outcomes["Count"].to_numpy()))
+    fig.update_layout(title="Match Outcome Distribution")
+    return fig.to_dict()
+
+
+st.plotly_chart(build_fig3(league, stage, agg), width="stretch")
 
 # ============================
 # 4. Top 10 Highest Scoring Matches
 # ============================
 st.subheader("Top 10 Highest Scoring Matches")
-top_matches = filtered.sort_values("total_goals", ascending=False).head(10)
-st.dataframe(top_matches[["date_utc", "home_team", "away_team", "total_goals", "stage"]])
+st.dataframe(agg["top_matches"][["date_utc", "home_team", "away_team", "total_goals", "stage"]])
 
 # ============================
 # 5. Average Goals by Stage
 # ============================
-avg_goals_stage = filtered.groupby("stage")["total_goals"].mean().reset_index()
-fig5 = px.bar(avg_goals_stage, x="stage", y="total_goals", title="Average Goals by Stage")
-st.plotly_chart(fig5, use_container_width=True)
+@st.cache_data(show_spinner=False)
+def build_fig5(league: str, stage: str, _agg: dict) -> dict:
+    avg_goals_stage = _agg["avg_goals_stage"]
+    fig = go.Figure(go.Bar(x=avg_goals_stage["stage"].to_numpy(), y=avg_goals_stage["total_goals"].to_numpy()))
+    fig.update_layout(title="Average Goals by Stage", xaxis_title="stage", yaxis_title="total_goals")
+    return fig.to_dict()
+
+
+fig5_expander = st.expander("Average Goals by Stage", key="expander_fig5", on_change="rerun")
+with fig5_expander:
+    if fig5_expander.open:
+        st.plotly_chart(build_fig5(league, stage, agg), width="stretch")
 
 # ============================
 # 6. Top 5 Scoring Teams
 # ============================
-top5_teams = (
-    team_goals.groupby("team")["goals"]
-    .sum()
-    .sort_values(ascending=False)
-    .head(5)
-    .reset_index()
-)
-fig6 = px.bar(top5_teams, x="team", y="goals", title="Top 5 Scoring Teams")
-st.plotly_chart(fig6, use_container_width=True)
+@st.cache_data(show_spinner=False)
+def build_fig6(league: str, stage: str, _agg: dict) -> dict:
+    top5_teams = _agg["top5_teams"]
+    fig = go.Figure(go.Bar(x=top5_teams["team"].to_numpy(), y=top5_teams["goals"].to_numpy()))
+    fig.update_layout(title="Top 5 Scoring Teams", xaxis_title="team", yaxis_title="goals")
+    return fig.to_dict()
+
+
+fig6_expander = st.expander("Top 5 Scoring Teams", key="expander_fig6", on_change="rerun")
+with fig6_expander:
+    if fig6_expander.open:
+        st.plotly_chart(build_fig6(league, stage, agg), width="stretch")
 
 # ============================
 # 7. Matchday Goal Trend
 # ============================
-if "matchday" in filtered.columns:
-    trend = filtered.groupby("matchday")["total_goals"].sum().reset_index()
-    fig7 = px.line(trend, x="matchday", y="total_goals", title="Goals Trend by Matchday", markers=True)
-    st.plotly_chart(fig7, use_container_width=True)
+@st.cache_data(show_spinner=False)
+def build_fig7(league: str, stage: str, _agg: dict) -> dict:
+    fig = px.line(_agg["trend"], x="matchday", y="total_goals", title="Goals Trend by Matchday", markers=True)
+    return fig.to_dict()
+
+
+fig7_expander = st.expander("Goals Trend by Matchday", key="expander_fig7", on_change="rerun")
+with fig7_expander:
+    if fig7_expander.open:
+        st.plotly_chart(build_fig7(league, stage, agg), width="stretch")
 
 # ============================
 # 8. Goal Difference Distribution
 # ============================
-fig8 = px.histogram(filtered, x="goal_difference", nbins=12, title="Goal Difference Distribution")
-st.plotly_chart(fig8, use_container_width=True)
+@st.cache_data(show_spinner=False)
+def build_fig8(league: str, stage: str, _agg: dict) -> dict:
+    goal_diff_hist = _agg["goal_diff_hist"]
+    fig = go.Figure(go.Bar(x=goal_diff_hist["goal_difference"], y=goal_diff_hist["count"]))
+    fig.update_layout(
+        title="Goal Difference Distribution", xaxis_title="goal_difference", yaxis_title="count", bargap=0
+    )
+    return fig.to_dict()
+
+
+fig8_expander = st.expander("Goal Difference Distribution", key="expander_fig8", on_change="rerun")
+with fig8_expander:
+    if fig8_expander.open:
+        st.plotly_chart(build_fig8(league, stage, agg), width="stretch")
 
 # ============================
 # 9. Goals Heatmap
 # ============================
-heatmap_df = filtered.groupby(["fulltime_home", "fulltime_away"]).size().reset_index(name="matches")
-fig9 = px.density_heatmap(
-    heatmap_df,
-    x="fulltime_home",
-    y="fulltime_away",
-    z="matches",
-    title="Home vs Away Goals Heatmap",
-    color_continuous_scale="Turbo"
-)
-st.plotly_chart(fig9, use_container_width=True)
+@st.cache_data(show_spinner=False)
+def build_fig9(league: str, stage: str, _agg: dict) -> dict:
+    fig = px.imshow(
+        _agg["heatmap_grid"],
+        origin="lower",
+        labels={"x": "fulltime_home", "y": "fulltime_away", "color": "matches"},
+        title="Home vs Away Goals Heatmap",
+        color_continuous_scale="Turbo"
+    )
+    return fig.to_dict()
+
+
+fig9_expander = st.expander("Home vs Away Goals Heatmap", key="expander_fig9", on_change="rerun")
+with fig9_expander:
+    if fig9_expander.open:
+        st.plotly_chart(build_fig9(league, stage, agg), width="stretch")
 
 # ============================
 # 10. Matches by Referee
 # ============================
-ref_df = filtered["referee"].value_counts().head(10).reset_index()
-ref_df.columns = ["Referee", "Matches"]
-fig10 = px.bar(ref_df, x="Referee", y="Matches", title="Top 10 Referees by Matches")
-st.plotly_chart(fig10, use_container_width=True)
+@st.cache_data(show_spinner=False)
+def build_fig10(league: str, stage: str, _agg: dict) -> dict:
+    ref_df = _agg["ref_df"]
+    fig = go.Figure(go.Bar(x=ref_df["Referee"].to_numpy(), y=ref_df["Matches"].to_numpy()))
+    fig.update_layout(title="Top 10 Referees by Matches", xaxis_title="Referee", yaxis_title="Matches")
+    return fig.to_dict()
+
+
+fig10_expander = st.expander("Top 10 Referees by Matches", key="expander_fig10", on_change="rerun")
+with fig10_expander:
+    if fig10_expander.open:
+        st.plotly_chart(build_fig10(league, stage, agg), width="stretch")